@@ -1,5 +1,7 @@
+import json
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime
 
 # Configure page
@@ -23,16 +25,54 @@ with st.sidebar:
         help="Minimum similarity score to use cached answer"
     )
 
+def stream_tokens(events):
+    """Yield answer chunks from the backend's NDJSON event stream"""
+    for event in events:
+        if "error" in event:
+            raise RuntimeError(event["error"])
+        yield event["token"]
+
+def send_feedback(key, question, backend_url):
+    """Post a thumbs-up/down on a cached answer, which tunes the cache threshold"""
+    rating = st.session_state[key]
+    if rating is None:
+        return
+    try:
+        st.session_state.http.post(
+            f"{backend_url}/feedback",
+            json={"question": question, "helpful": rating == 1},
+            timeout=10
+        ).raise_for_status()
+    except requests.RequestException as e:
+        st.toast(f"Couldn't send feedback: {str(e)}")
+
+def feedback_control(index, details, question):
+    # Only semantic matches are rated; exact repeats of an earlier question ("exact")
+    # weren't chosen by the similarity threshold
+    if details.get("source") == "cache":
+        key = f"feedback_{index}"
+        st.feedback("thumbs", key=key, on_change=send_feedback, args=(key, question, backend_url))
+
 # Main chat interface
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
-for message in st.session_state.messages:
+# One keep-alive HTTP session per browser session, so each turn reuses the socket
+if "http" not in st.session_state:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Connection": "keep-alive"})
+    st.session_state.http = session
+
+for index, message in enumerate(st.session_state.messages):
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
         if "details" in message:
             with st.expander("Details"):
                 st.json(message["details"])
+            feedback_control(index, message["details"], st.session_state.messages[index - 1]["content"])
 
 if prompt := st.chat_input("Ask a question..."):
     st.session_state.messages.append({"role": "user", "content": prompt})
@@ -40,37 +80,47 @@ if prompt := st.chat_input("Ask a question..."):
         st.markdown(prompt)
 
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            try:
-                response = requests.post(
+        try:
+            # The backend computes the first event before sending headers, so the
+            # spinner covers the lookup
+            with st.spinner("Thinking..."):
+                response = st.session_state.http.post(
                     f"{backend_url}/ask",
-                    json={"question": prompt}
-                ).json()
-
-                st.markdown(response["answer"])
-                
-                details = {
-                    "source": response["source"],
-                    "timestamp": response["timestamp"]
-                }
-                if response["source"] == "cache":
-                    details.update({
-                        "similarity": response["similarity"],
-                        "matched_question": response["matched_question"]
-                    })
+                    json={"question": prompt},
+                    stream=True,
+                    timeout=30
+                )
+            # Close the streamed response even on errors, returning its socket to the pool
+            with response:
+                response.raise_for_status()
+                events = (json.loads(line) for line in response.iter_lines() if line)
+                # The first event carries the response details, the rest are answer chunks
+                response_details = next(events)
+                answer = st.write_stream(stream_tokens(events))
+            
+            details = {
+                "source": response_details["source"],
+                "timestamp": response_details["timestamp"]
+            }
+            if response_details["source"] in ("cache", "exact"):
+                details.update({
+                    "similarity": response_details["similarity"],
+                    "matched_question": response_details["matched_question"]
+                })
 
-                with st.expander("Response Details"):
-                    st.json(details)
+            with st.expander("Response Details"):
+                st.json(details)
+            feedback_control(len(st.session_state.messages), details, prompt)
 
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": response["answer"],
-                    "details": details
-                })
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": answer,
+                "details": details
+            })
 
-            except Exception as e:
-                st.error(f"Error: {str(e)}")
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": f"Error: {str(e)}"
-                })
\ No newline at end of file
+        except Exception as e:
+            st.error(f"Error: {str(e)}")
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": f"Error: {str(e)}"
+            })
\ No newline at end of file
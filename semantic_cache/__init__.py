@@ -0,0 +1,3 @@
+from semantic_cache.core import SemanticCacheQA
+
+__all__ = ["SemanticCacheQA"]
@@ -0,0 +1,609 @@
+import os
+import sys
+
+def worker_count():
+    """Number of uvicorn workers: --workers if given, else WEB_CONCURRENCY (uvicorn's default)"""
+    value = os.getenv("WEB_CONCURRENCY", "1")
+    # uvicorn's spawned workers inherit the parent's command line
+    for position, arg in enumerate(sys.argv):
+        if arg == "--workers" and position + 1 < len(sys.argv):
+            value = sys.argv[position + 1]
+        elif arg.startswith("--workers="):
+            value = arg.split("=", 1)[1]
+    return max(1, int(value))
+
+# Pin BLAS/OpenMP threads before torch is imported, splitting the physical
+# cores between uvicorn workers so they don't oversubscribe each other
+WORKERS = worker_count()
+os.environ.setdefault("OMP_NUM_THREADS", str(max(1, (os.cpu_count() or 2) // 2 // WORKERS)))
+os.environ.setdefault("MKL_NUM_THREADS", os.environ["OMP_NUM_THREADS"])
+NUM_THREADS = int(os.environ["OMP_NUM_THREADS"])
+
+import asyncio
+import platform
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import orjson
+import torch
+import xxhash
+from dotenv import load_dotenv
+from pinecone import Pinecone, ServerlessSpec
+from langchain_groq import ChatGroq
+from sentence_transformers import SentenceTransformer
+from semantic_cache.local_index import LocalIndex, Match
+from semantic_cache.threshold import AdaptiveThreshold
+
+# Load environment variables
+load_dotenv()
+
+# Applies to the PyTorch backend; ONNX Runtime gets the same counts through its
+# SessionOptions in _load_embedding_model, since it ignores these settings
+torch.set_num_threads(NUM_THREADS)
+torch.set_num_interop_threads(1)
+print(f"Using {NUM_THREADS} intra-op threads per worker ({WORKERS} worker(s), {os.cpu_count()} CPUs)")
+
+def select_onnx_file():
+    """Pick the prequantized CPU ONNX export that matches this CPU"""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "onnx/model_qint8_arm64.onnx"
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = set(f.read().split())
+    except OSError:
+        flags = set()
+    if "avx512_vnni" in flags:
+        return "onnx/model_qint8_avx512_vnni.onnx"
+    if "avx512f" in flags:
+        return "onnx/model_qint8_avx512.onnx"
+    if "avx2" in flags:
+        return "onnx/model_quint8_avx2.onnx"
+    # Plain FP32 export (the O4 export is fp16 and GPU-only)
+    return "onnx/model.onnx"
+
+class SemanticCacheQA:
+    def __init__(self):
+        # Initialize embedding model (Hugging Face). Setting EMBEDDING_DIMENSION below
+        # 384 (e.g. 256) truncates vectors to their first components and re-normalizes
+        # them, shrinking Pinecone payloads and local search work proportionally.
+        # Opt-in only: it uses a separate, empty index and the threshold was tuned at 384
+        self.dimension = int(os.getenv("EMBEDDING_DIMENSION", "384"))
+        # The model only produces 384 components, and IVF-PQ splits vectors into
+        # 8-dimension sub-quantizers
+        if not 0 < self.dimension <= 384 or self.dimension % 8:
+            raise ValueError(
+                f"EMBEDDING_DIMENSION must be a multiple of 8 between 8 and 384, got {self.dimension}"
+            )
+        self.embedding_backend = os.getenv("EMBEDDING_BACKEND", "onnx")
+        self.embedding_model = self._load_embedding_model()
+
+        # The model's Rust-backed fast tokenizer, used directly for micro-batches
+        self.tokenizer = self.embedding_model.tokenizer
+
+        # Initialize Groq LLM with current model
+        self.llm = ChatGroq(
+            temperature=0,
+            groq_api_key=os.getenv("GROQ_API_KEY"),
+            model_name="llama3-8b-8192"  # Updated to current model
+        )
+
+        # Initialize Pinecone with new API (using free-tier supported region)
+        self.pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+
+        # Shared httpx.AsyncClient for the server's Pinecone REST calls (set by main.py);
+        # without it the async paths fall back to the blocking Pinecone client
+        self.http = None
+        self.pinecone_headers = {
+            "Api-Key": os.getenv("PINECONE_API_KEY") or "",
+            "Content-Type": "application/json",
+            "X-Pinecone-API-Version": "2024-10"
+        }
+
+        # Create or connect to Pinecone index (one per embedding dimension)
+        self.index_name = "semantic-cache-qa"
+        if self.dimension != 384:
+            self.index_name = f"{self.index_name}-{self.dimension}"
+        self._initialize_index()
+
+        # Similarity threshold (adjust as needed; quantized embeddings differ
+        # slightly from the FP32 model, so re-tune after switching exports).
+        # This is the starting point: each namespace then adapts its own copy
+        # toward a target hit rate and user feedback
+        self.similarity_threshold = 0.85
+        # Namespaces come from the client, so only configured ones (comma-separated
+        # NAMESPACES) get their own threshold; anything else uses "default"
+        namespaces = {"default"} | {
+            name.strip() for name in os.getenv("NAMESPACES", "").split(",") if name.strip()
+        }
+        self.thresholds = {name: AdaptiveThreshold(self.similarity_threshold) for name in namespaces}
+
+        # In-process exact-match cache (normalized question -> response)
+        self.local_cache = OrderedDict()
+        self.local_cache_size = 1024
+        self.local_cache_lock = threading.Lock()
+
+        # Bounded per-instance embedding memo (text -> read-only vector), so a
+        # text re-embedded on a cache miss reuses its vector
+        self.embedding_cache = OrderedDict()
+        self.embedding_cache_size = 2048
+        self.embedding_cache_lock = threading.Lock()
+
+        # Local FAISS mirror of the Pinecone cache (Pinecone stays the durable copy);
+        # set LOCAL_INDEX=0 to query Pinecone directly, e.g. with several replicas.
+        # Workers (WEB_CONCURRENCY or --workers) can't see each other's writes,
+        # so the mirror is only used with a single worker
+        self.use_local_index = os.getenv("LOCAL_INDEX", "1") != "0"
+        if self.use_local_index and WORKERS > 1:
+            print(f"Local index disabled: {WORKERS} workers would each hold a stale mirror")
+            self.use_local_index = False
+        self.local_index = LocalIndex(
+            self.dimension,
+            binary_prefilter=os.getenv("BINARY_PREFILTER", "0") == "1"
+        )
+        if self.use_local_index:
+            # Re-sync whenever the saved copy disagrees with Pinecone, e.g. after
+            # writes from the demo or entries lost in a crash
+            expected_count = self.index.describe_index_stats().total_vector_count
+            if not self.local_index.load(expected_count):
+                self.local_index.sync_from_pinecone(self.index)
+
+        # IDs of questions already upserted (seeded from the local mirror)
+        self.cached_ids = set(self.local_index.ids)
+
+        # Micro-batching of concurrent embedding requests
+        self.embed_batch_size = 32
+        self.embed_batch_window = 0.008
+        self._embed_queue = None
+        self._embed_worker = None
+
+        # Background Pinecone upserts (strong refs so tasks aren't GC'd mid-flight)
+        self._pending_upserts = set()
+        # Background writes that failed, retried on close()
+        self._failed_upserts = []
+
+    def _load_embedding_model(self):
+        """Load MiniLM as an int8-quantized ONNX export, or compiled PyTorch (EMBEDDING_BACKEND=torch)"""
+        if self.embedding_backend != "torch":
+            import onnxruntime
+
+            # ONNX Runtime has its own thread pool and ignores OMP/MKL/torch settings
+            session_options = onnxruntime.SessionOptions()
+            session_options.intra_op_num_threads = NUM_THREADS
+            session_options.inter_op_num_threads = 1
+            return SentenceTransformer(
+                'all-MiniLM-L6-v2',
+                backend="onnx",
+                model_kwargs={
+                    "file_name": select_onnx_file(),
+                    "session_options": session_options
+                },
+                truncate_dim=self.dimension
+            )
+
+        # Fuse layernorm/GeLU/softmax and drop per-op Python dispatch; dynamic
+        # shapes avoid recompiling for every sequence length
+        torch.set_float32_matmul_precision("medium")
+        model = SentenceTransformer('all-MiniLM-L6-v2', truncate_dim=self.dimension)
+        transformer = model[0]
+        transformer.auto_model = torch.compile(
+            transformer.auto_model,
+            mode="reduce-overhead",
+            dynamic=True
+        )
+        return model
+
+    def _initialize_index(self):
+        # Embeddings are L2-normalized at encode time, so dot product equals cosine
+        # similarity without the server recomputing norms
+        if self.index_name not in self.pc.list_indexes().names():
+            self.pc.create_index(
+                name=self.index_name,
+                dimension=self.dimension,
+                metric="dotproduct",
+                spec=ServerlessSpec(
+                    cloud="aws",
+                    region="us-east-1"  # Free-tier supported region
+                )
+            )
+
+        description = self.pc.describe_index(self.index_name)
+        if description.metric != "dotproduct":
+            # Scores stay correct on an older cosine index; recreate it to drop the norm work
+            print(f"Index '{self.index_name}' uses a non-dotproduct metric; recreate it to switch")
+        self.index_url = f"https://{description.host}"
+        self.index = self.pc.Index(self.index_name, host=description.host)
+
+    @staticmethod
+    def normalize_question(question):
+        """Normalize a question for exact-match lookups"""
+        return question.strip().lower()
+
+    def question_id(self, question):
+        """Stable content-hash ID for a question (same across restarts)"""
+        return xxhash.xxh3_64_hexdigest(self.normalize_question(question).encode())
+
+    def resolve_namespace(self, namespace):
+        """Map unknown namespaces to "default" so client input can't grow state"""
+        return namespace if namespace in self.thresholds else "default"
+
+    def get_local_answer(self, question, namespace="default"):
+        """Look up an exact (normalized) match in the local cache"""
+        key = (self.resolve_namespace(namespace), self.normalize_question(question))
+        with self.local_cache_lock:
+            response = self.local_cache.get(key)
+            if response is not None:
+                self.local_cache.move_to_end(key)
+                return dict(response)
+        return None
+
+    def add_to_local_cache(self, question, response, namespace="default"):
+        """Remember a response in the local cache, evicting the oldest entry"""
+        if response["source"] == "llm":
+            # Marked "exact" so feedback on it isn't mistaken for a semantic match
+            response = {
+                "source": "exact",
+                "answer": response["answer"],
+                "similarity": 1.0,
+                "matched_question": question,
+                "timestamp": response["timestamp"]
+            }
+        key = (self.resolve_namespace(namespace), self.normalize_question(question))
+        with self.local_cache_lock:
+            self.local_cache[key] = response
+            self.local_cache.move_to_end(key)
+            if len(self.local_cache) > self.local_cache_size:
+                self.local_cache.popitem(last=False)
+
+    def get_cached_embedding(self, text):
+        """Return a memoized embedding for a text, or None"""
+        with self.embedding_cache_lock:
+            embedding = self.embedding_cache.get(text)
+            if embedding is not None:
+                self.embedding_cache.move_to_end(text)
+            return embedding
+
+    def cache_embedding(self, text, embedding):
+        """Memoize an embedding, read-only so callers can't change the shared copy"""
+        embedding = embedding.copy()
+        embedding.setflags(write=False)
+        with self.embedding_cache_lock:
+            self.embedding_cache[text] = embedding
+            self.embedding_cache.move_to_end(text)
+            if len(self.embedding_cache) > self.embedding_cache_size:
+                self.embedding_cache.popitem(last=False)
+        return embedding
+
+    def encode_batch(self, texts):
+        """Generate embeddings for a batch of texts in one forward pass"""
+        # Tokenize the whole batch at once, padded only to its longest text
+        features = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.embedding_model.max_seq_length,
+            return_tensors="pt"
+        )
+        with torch.inference_mode():
+            # Same pipeline as SentenceTransformer.encode: mean pooling, then L2 normalize
+            token_embeddings = self.embedding_model[0].auto_model(**features).last_hidden_state
+            mask = features["attention_mask"].unsqueeze(-1).to(token_embeddings.dtype)
+            embeddings = (token_embeddings * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            embeddings = embeddings[:, :self.dimension]
+            embeddings = torch.nn.functional.normalize(embeddings, p=2, dim=1)
+        return embeddings.cpu().numpy()
+
+    async def _embed_async(self, text):
+        """Queue a text for the micro-batcher and wait for its embedding"""
+        embedding = self.get_cached_embedding(text)
+        if embedding is not None:
+            return embedding
+
+        if self._embed_worker is None:
+            self._embed_queue = asyncio.Queue()
+            self._embed_worker = asyncio.create_task(self._embed_batches())
+        future = asyncio.get_running_loop().create_future()
+        await self._embed_queue.put((text, future))
+        return self.cache_embedding(text, await future)
+
+    async def _embed_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._embed_queue.get()]
+            deadline = loop.time() + self.embed_batch_window
+            while len(batch) < self.embed_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._embed_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Sort by length so each padded batch wastes as little compute as possible
+            texts = sorted({text for text, _ in batch}, key=len)
+            try:
+                embeddings = await loop.run_in_executor(None, self.encode_batch, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            by_text = dict(zip(texts, embeddings))
+            for text, future in batch:
+                if not future.done():
+                    future.set_result(by_text[text])
+
+    def warm_up(self):
+        """Run small batches so kernel selection and buffer allocation happen up front"""
+        # torch.compile specializes a batch of 1 even with dynamic=True, and single
+        # questions are the common micro-batch, so compile that graph here too
+        for batch_size in (1, 8):
+            self.encode_batch(["warmup"] * batch_size)
+
+    def _accept_match(self, match, namespace):
+        """Apply the namespace's threshold to the closest match and record the outcome"""
+        threshold = self.thresholds[self.resolve_namespace(namespace)]
+        hit = match is not None and match.score > threshold.value
+        threshold.record(hit)
+        return match if hit else None
+
+    def record_feedback(self, helpful, question, namespace="default"):
+        """Record a user's thumbs-up/down on a semantic cache hit, returning the current threshold"""
+        namespace = self.resolve_namespace(namespace)
+        threshold = self.thresholds[namespace]
+        key = (namespace, self.normalize_question(question))
+        with self.local_cache_lock:
+            response = self.local_cache.get(key)
+            if response is not None and response["source"] == "exact":
+                # The LLM's own answer to this question; no threshold produced it
+                return threshold.value
+            if response is not None and not helpful:
+                # Forget the wrong match so the next ask goes back to the semantic lookup
+                del self.local_cache[key]
+        threshold.record_feedback(helpful)
+        return threshold.value
+
+    def find_similar_question(self, query_embedding, namespace="default"):
+        """Search for similar questions in the cache"""
+        if self.use_local_index:
+            return self._accept_match(self.local_index.search(query_embedding), namespace)
+
+        results = self.index.query(
+            vector=query_embedding.tolist(),
+            top_k=1,
+            include_metadata=True
+        )
+        return self._accept_match(results.matches[0] if results.matches else None, namespace)
+
+    async def find_similar_question_async(self, query_embedding, namespace="default"):
+        """Search for similar questions without blocking the event loop"""
+        if self.use_local_index or self.http is None:
+            return self.find_similar_question(query_embedding, namespace)
+
+        response = await self.http.post(
+            f"{self.index_url}/query",
+            headers=self.pinecone_headers,
+            content=orjson.dumps({
+                "vector": query_embedding,
+                "topK": 1,
+                "includeMetadata": True
+            }, option=orjson.OPT_SERIALIZE_NUMPY)
+        )
+        response.raise_for_status()
+        matches = orjson.loads(response.content).get("matches")
+        match = Match(matches[0]["id"], matches[0]["score"], matches[0]["metadata"]) if matches else None
+        return self._accept_match(match, namespace)
+
+    def generate_answer(self, question):
+        """Generate answer using LLM"""
+        try:
+            response = self.llm.invoke(question)
+            return response.content
+        except Exception as e:
+            print(f"Error generating answer: {str(e)}")
+            return "Sorry, I couldn't generate an answer at this time."
+
+    def add_to_cache(self, question, answer, embedding, timestamp, background=False):
+        """Store new Q&A pair in cache (Pinecone write deferred if background=True)"""
+        question_id = self.question_id(question)
+        if question_id in self.cached_ids:
+            return
+
+        metadata = {
+            "question": question,
+            "answer": answer,
+            "timestamp": timestamp
+        }
+
+        # Update local state right away; in the server the Pinecone write can
+        # finish after the response has been sent
+        self.cached_ids.add(question_id)
+        if self.use_local_index:
+            self.local_index.add(question_id, embedding, metadata)
+        if background:
+            task = asyncio.create_task(self._upsert_async(question_id, embedding, metadata))
+            self._pending_upserts.add(task)
+            task.add_done_callback(self._pending_upserts.discard)
+        else:
+            self.upsert(question_id, embedding, metadata)
+
+    def upsert(self, question_id, embedding, metadata):
+        """Write a single cache entry to Pinecone"""
+        self.index.upsert(vectors=[{
+            "id": question_id,
+            "values": embedding.tolist(),
+            "metadata": metadata
+        }])
+
+    async def _upsert_async(self, question_id, embedding, metadata):
+        try:
+            if self.http is None:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, self.upsert, question_id, embedding, metadata)
+                return
+
+            response = await self.http.post(
+                f"{self.index_url}/vectors/upsert",
+                headers=self.pinecone_headers,
+                # orjson writes the float32 array directly, without boxing each value
+                content=orjson.dumps({"vectors": [{
+                    "id": question_id,
+                    "values": embedding,
+                    "metadata": metadata
+                }]}, option=orjson.OPT_SERIALIZE_NUMPY)
+            )
+            response.raise_for_status()
+        except Exception as e:
+            print(f"Error caching answer in Pinecone (will retry on shutdown): {str(e)}")
+            self._failed_upserts.append((question_id, embedding, metadata))
+
+    async def retry_failed_upserts(self):
+        """Retry failed background writes once, forgetting entries that still fail"""
+        loop = asyncio.get_running_loop()
+        failed, self._failed_upserts = self._failed_upserts, []
+        for question_id, embedding, metadata in failed:
+            try:
+                await loop.run_in_executor(None, self.upsert, question_id, embedding, metadata)
+            except Exception as e:
+                print(f"Error caching answer in Pinecone: {str(e)}")
+                # Not in Pinecone, so don't treat it as cached; the saved mirror's
+                # count no longer matches and is re-synced on the next start
+                self.cached_ids.discard(question_id)
+
+    async def wait_for_pending_upserts(self):
+        """Wait for background Pinecone writes to finish"""
+        if self._pending_upserts:
+            await asyncio.gather(*self._pending_upserts, return_exceptions=True)
+
+    async def close(self):
+        """Flush pending writes, stop the micro-batcher and persist the local mirror"""
+        await self.wait_for_pending_upserts()
+        await self.retry_failed_upserts()
+        if self._embed_worker is not None:
+            self._embed_worker.cancel()
+        if self.use_local_index:
+            self.local_index.save()
+
+    def ask_questions(self, questions, namespace="default"):
+        """Answer a batch of questions, returning one response per question in order
+
+        New questions are embedded in one forward pass and looked up concurrently;
+        misses then go to the LLM one at a time, so a later paraphrase in the same
+        batch reuses an answer generated earlier instead of calling the LLM again
+        """
+        responses = {
+            question: self.get_local_answer(question, namespace)
+            for question in dict.fromkeys(questions)
+        }
+        pending = [question for question, response in responses.items() if response is None]
+        embeddings = {question: self.get_cached_embedding(question) for question in pending}
+        missing = [question for question, embedding in embeddings.items() if embedding is None]
+        if missing:
+            for question, embedding in zip(missing, self.encode_batch(missing)):
+                embeddings[question] = self.cache_embedding(question, embedding)
+
+        # Pinecone lookups are I/O-bound, so they overlap across threads; with the
+        # local mirror (LOCAL_INDEX=1) they serialize on its lock instead
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            matches = dict(zip(pending, executor.map(
+                lambda question: self.find_similar_question(embeddings[question], namespace),
+                pending
+            )))
+
+        threshold = self.thresholds[self.resolve_namespace(namespace)]
+        answered = []
+        for question in pending:
+            response = self._answer_from_batch(
+                question, embeddings[question], matches[question], answered, threshold.value
+            )
+            self.add_to_local_cache(question, response, namespace)
+            responses[question] = response
+        return [responses[question] for question in questions]
+
+    def _answer_from_batch(self, question, embedding, match, answered, threshold):
+        """Answer one question from its cache match, this batch's answers, or the LLM"""
+        if match:
+            return {
+                "source": "cache",
+                "answer": match.metadata["answer"],
+                "similarity": float(match.score),
+                "matched_question": match.metadata["question"],
+                "timestamp": match.metadata["timestamp"]
+            }
+
+        # Closest question answered by the LLM earlier in this batch
+        best = max(
+            ((float(embedding @ other), response) for other, response in answered),
+            key=lambda item: item[0],
+            default=None
+        )
+        if best and best[0] > threshold:
+            score, response = best
+            return {**response, "source": "cache", "similarity": score}
+
+        timestamp = datetime.now(timezone.utc).isoformat()
+        answer = self.generate_answer(question)
+        self.add_to_cache(question, answer, embedding, timestamp)
+        answered.append((embedding, {
+            "answer": answer,
+            "matched_question": question,
+            "timestamp": timestamp
+        }))
+        return {
+            "source": "llm",
+            "answer": answer,
+            "similarity": None,
+            "matched_question": None,
+            "timestamp": timestamp
+        }
+
+    async def stream_answer(self, question, namespace="default"):
+        """Yield the response details first, then the answer as {"token": ...} chunks"""
+        response = self.get_local_answer(question, namespace)
+        if response is None:
+            embedding = await self._embed_async(question)
+            match = await self.find_similar_question_async(embedding, namespace)
+            if match:
+                response = {
+                    "source": "cache",
+                    "answer": match.metadata["answer"],
+                    "similarity": float(match.score),
+                    "matched_question": match.metadata["question"],
+                    "timestamp": match.metadata["timestamp"]
+                }
+                self.add_to_local_cache(question, response, namespace)
+
+        if response:
+            yield {key: value for key, value in response.items() if key != "answer"}
+            yield {"token": response["answer"]}
+            return
+
+        timestamp = datetime.now(timezone.utc).isoformat()
+        yield {
+            "source": "llm",
+            "similarity": None,
+            "matched_question": None,
+            "timestamp": timestamp
+        }
+
+        chunks = []
+        try:
+            async for chunk in self.llm.astream(question):
+                chunks.append(chunk.content)
+                yield {"token": chunk.content}
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band and skip caching
+            yield {"error": str(e)}
+            return
+
+        answer = "".join(chunks)
+        self.add_to_cache(question, answer, embedding, timestamp, background=True)
+        self.add_to_local_cache(question, {
+            "source": "llm",
+            "answer": answer,
+            "similarity": None,
+            "matched_question": None,
+            "timestamp": timestamp
+        }, namespace)
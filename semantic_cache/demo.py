@@ -0,0 +1,65 @@
+from semantic_cache.core import SemanticCacheQA
+
+# Initialize the QA system
+qa_system = SemanticCacheQA()
+
+# Test cases
+test_sets = [
+    {
+        "name": "Oceans",
+        "questions": [
+            "How many oceans are there in the world?",
+            "What is the count of oceans on Earth?"
+        ]
+    },
+    {
+        "name": "Capital",
+        "questions": [
+            "What is the capital of Japan?",
+            "Which city is the capital of Japan?"
+        ]
+    },
+    {
+        "name": "India President",
+        "questions": [
+            "Who is the current President of the India?",
+            "Who's leading the Indian government right now?"
+        ]
+    },
+    {
+        "name": "Cache Miss",
+        "questions": [
+            "What are the symptoms of flu?"
+        ]
+    }
+]
+
+# Answer every test question as one batch: embeddings in one forward pass,
+# concurrent cache lookups, then the LLM for genuine misses one at a time.
+# The lookups only overlap with LOCAL_INDEX=0; with the local mirror they
+# queue on its lock, which is fine since each search is fast
+all_questions = [question for test_set in test_sets for question in test_set["questions"]]
+responses = dict(zip(all_questions, qa_system.ask_questions(all_questions)))
+
+# Run test cases
+for test_set in test_sets:
+    print(f"\n{'='*40}")
+    print(f"Test Set: {test_set['name']}")
+    print(f"{'='*40}")
+    for question in test_set["questions"]:
+        response = responses[question]
+        print(f"\nQuestion: {question}")
+        if response["source"] in ("cache", "exact"):
+            print(f"✅ Answer from cache (similarity: {response['similarity']:.2f})")
+            print(f"Matched question: {response['matched_question']}")
+            print(f"Answer: {response['answer']}")
+            print(f"Originally cached at: {response['timestamp']}")
+        else:
+            print("🆕 Answer from LLM")
+            print(f"Answer: {response['answer']}")
+            print(f"Cached at: {response['timestamp']}")
+        print("-" * 40)
+
+# Persist the local mirror so the next run skips the Pinecone sync
+if qa_system.use_local_index:
+    qa_system.local_index.save()
\ No newline at end of file
@@ -0,0 +1,238 @@
+import os
+import json
+import threading
+from collections import namedtuple
+import faiss
+import numpy as np
+
+# Mirrors the fields of a Pinecone match that the QA classes read
+Match = namedtuple("Match", ["id", "score", "metadata"])
+
+# Bits set per byte, for NumPy versions without np.bitwise_count (< 2.0)
+POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def sign_codes(vectors):
+    """Pack the sign bit of every dimension, 8 dimensions per byte"""
+    return np.packbits(np.asarray(vectors) > 0, axis=-1)
+
+def hamming_distances(codes, query_code):
+    """Hamming distance between each row of packed codes and one query code"""
+    diff = np.bitwise_xor(codes, query_code)
+    if hasattr(np, "bitwise_count"):
+        if diff.shape[1] % 8 == 0:
+            # One popcount per 64 bits (6 words for a 384-d vector)
+            diff = diff.view(np.uint64)
+        return np.bitwise_count(diff).sum(axis=1, dtype=np.int32)
+    return POPCOUNT_TABLE[diff].sum(axis=1, dtype=np.int32)
+
+class LocalIndex:
+    """In-process FAISS mirror of the Pinecone cache (HNSW, then IVF-PQ once large)"""
+
+    def __init__(self, dimension, path=None, m=32, ef_search=64,
+                 pq_train_size=10000, nlist=256, pq_m=None, nbits=8, nprobe=16, rerank=8,
+                 binary_prefilter=False, prefilter_k=64):
+        self.dimension = dimension
+        self.path = path or os.getenv("LOCAL_INDEX_PATH", "semantic_cache.faiss")
+        self.metadata_path = f"{self.path}.json"
+        self.m = m
+        self.ef_search = ef_search
+        self.lock = threading.Lock()
+
+        # Product quantization kicks in once there is enough data to train on:
+        # searches scan 8-bit PQ codes (48 B per 384-d vector instead of 1536 B),
+        # cutting the bytes read per query. The full vectors are still kept to
+        # re-rank the shortlist exactly, so this doesn't save memory
+        self.pq_train_size = pq_train_size
+        self.nlist = nlist
+        self.pq_m = pq_m or dimension // 8
+        self.nbits = nbits
+        self.nprobe = nprobe
+        self.rerank = rerank
+        self._compressing = False
+        # Set if training fails, so every later add doesn't retrain from scratch
+        self._compress_failed = False
+
+        # Optional sign-bit prefilter: Hamming distance over packed codes picks
+        # prefilter_k candidates, which are then re-scored with exact inner products
+        self.binary_prefilter = binary_prefilter
+        self.prefilter_k = prefilter_k
+        # Preallocated buffer; only the first len(self.ids) rows are in use
+        self.codes = np.empty((0, (dimension + 7) // 8), dtype=np.uint8)
+
+        # Position in the FAISS index -> Pinecone ID / metadata
+        self.ids = []
+        self.metadata = []
+        self.index = self._new_index()
+
+    def _new_index(self):
+        index = faiss.IndexHNSWFlat(self.dimension, self.m, faiss.METRIC_INNER_PRODUCT)
+        self._configure(index)
+        return index
+
+    def _configure(self, index):
+        if isinstance(index, faiss.IndexHNSWFlat):
+            index.hnsw.efSearch = self.ef_search
+        else:
+            # Scan PQ codes, then re-rank a small shortlist with exact inner products
+            faiss.extract_index_ivf(index).nprobe = self.nprobe
+            index.k_factor = self.rerank
+
+    def _maybe_compress(self):
+        """Start switching from HNSW to IVF-PQ once the mirror is large enough to train"""
+        # Called with the lock held; training takes seconds, so it runs on its own thread
+        if (self._compressing or self._compress_failed
+                or not isinstance(self.index, faiss.IndexHNSWFlat)
+                or self.index.ntotal < self.pq_train_size):
+            return
+        self._compressing = True
+        threading.Thread(target=self._compress, args=(self.index,), daemon=True).start()
+
+    def _compress(self, source):
+        """Build IVF-PQ from a snapshot of source, then swap it in"""
+        try:
+            with self.lock:
+                count = source.ntotal
+                vectors = source.reconstruct_n(0, count)
+
+            quantizer = faiss.IndexFlatIP(self.dimension)
+            ivfpq = faiss.IndexIVFPQ(
+                quantizer, self.dimension, self.nlist, self.pq_m, self.nbits,
+                faiss.METRIC_INNER_PRODUCT
+            )
+            ivfpq.train(vectors)
+            index = faiss.IndexRefineFlat(ivfpq)
+            index.add(vectors)
+            self._configure(index)
+
+            with self.lock:
+                if self.index is not source:
+                    # Replaced by load() or a re-sync while training
+                    return
+                # Replay vectors added since the snapshot so positions still line up
+                if source.ntotal > count:
+                    index.add(source.reconstruct_n(count, source.ntotal - count))
+                self.index = index
+        except Exception as e:
+            print(f"Error compressing local index, staying on HNSW: {str(e)}")
+            self._compress_failed = True
+        finally:
+            with self.lock:
+                self._compressing = False
+
+    def __len__(self):
+        return len(self.ids)
+
+    def load(self, expected_count=None):
+        """Load a previously saved index from disk, returning True on success
+
+        Returns False (so the caller re-syncs) when the files are missing, don't
+        match each other, or hold a different number of vectors than
+        expected_count (the live Pinecone vector count)
+        """
+        if not (os.path.exists(self.path) and os.path.exists(self.metadata_path)):
+            return False
+
+        index = faiss.read_index(self.path)
+        with open(self.metadata_path) as f:
+            saved = json.load(f)
+        if index.d != self.dimension or index.ntotal != len(saved["ids"]):
+            return False
+        if expected_count is not None and index.ntotal != expected_count:
+            return False
+        self._configure(index)
+        codes = self.codes[:0]
+        if self.binary_prefilter and index.ntotal:
+            codes = sign_codes(index.reconstruct_n(0, index.ntotal))
+
+        with self.lock:
+            self.index = index
+            self.ids = saved["ids"]
+            self.metadata = saved["metadata"]
+            self.codes = codes
+        return True
+
+    def sync_from_pinecone(self, pinecone_index):
+        """Rebuild the mirror from every vector stored in Pinecone"""
+        ids, vectors, metadata = [], [], []
+        for page in pinecone_index.list():
+            fetched = pinecone_index.fetch(ids=list(page))
+            for vector_id, vector in fetched.vectors.items():
+                ids.append(vector_id)
+                vectors.append(vector.values)
+                metadata.append(vector.metadata)
+
+        index = self._new_index()
+        codes = self.codes[:0]
+        if vectors:
+            # Older entries were stored unnormalized; inner product needs unit vectors
+            array = np.ascontiguousarray(vectors, dtype=np.float32)
+            faiss.normalize_L2(array)
+            index.add(array)
+            if self.binary_prefilter:
+                codes = sign_codes(array)
+
+        with self.lock:
+            self.index = index
+            self.ids = ids
+            self.metadata = metadata
+            self.codes = codes
+            self._maybe_compress()
+
+    def add(self, vector_id, embedding, metadata):
+        """Add a single (already normalized) embedding to the mirror"""
+        vector = np.ascontiguousarray(embedding, dtype=np.float32).reshape(1, -1)
+        with self.lock:
+            if self.binary_prefilter:
+                self._append_code(sign_codes(vector)[0])
+            self.index.add(vector)
+            self.ids.append(vector_id)
+            self.metadata.append(metadata)
+            self._maybe_compress()
+
+    def _append_code(self, code):
+        # Double the buffer when full so appends don't copy every row each time
+        count = len(self.ids)
+        if count == len(self.codes):
+            grown = np.empty((max(1, 2 * count), self.codes.shape[1]), dtype=np.uint8)
+            grown[:count] = self.codes[:count]
+            self.codes = grown
+        self.codes[count] = code
+
+    def search(self, embedding):
+        """Return the closest cached entry, or None if the mirror is empty"""
+        query = np.ascontiguousarray(embedding, dtype=np.float32).reshape(1, -1)
+        with self.lock:
+            if not self.ids:
+                return None
+            if self.binary_prefilter:
+                return self._search_prefiltered(query[0])
+            scores, positions = self.index.search(query, 1)
+            position = int(positions[0][0])
+            if position < 0:
+                return None
+            return Match(self.ids[position], float(scores[0][0]), self.metadata[position])
+
+    def _search_prefiltered(self, query):
+        distances = hamming_distances(self.codes[:len(self.ids)], sign_codes(query))
+        k = min(self.prefilter_k, len(distances))
+        candidates = np.argpartition(distances, k - 1)[:k]
+
+        # Re-score only the shortlist at full precision
+        vectors = self.index.reconstruct_batch(candidates.astype(np.int64))
+        scores = vectors @ query
+        best = int(np.argmax(scores))
+        position = int(candidates[best])
+        return Match(self.ids[position], float(scores[best]), self.metadata[position])
+
+    def save(self):
+        """Persist the index and its metadata next to each other on disk"""
+        # Write to per-process temp files and rename, so a crash never leaves a torn
+        # file and the demo can save while the server does
+        index_tmp = f"{self.path}.{os.getpid()}.tmp"
+        metadata_tmp = f"{self.metadata_path}.{os.getpid()}.tmp"
+        with self.lock:
+            faiss.write_index(self.index, index_tmp)
+            with open(metadata_tmp, "w") as f:
+                json.dump({"ids": self.ids, "metadata": self.metadata}, f)
+        os.replace(index_tmp, self.path)
+        os.replace(metadata_tmp, self.metadata_path)
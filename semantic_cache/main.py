@@ -0,0 +1,72 @@
+import asyncio
+from contextlib import asynccontextmanager
+import httpx
+import orjson
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from semantic_cache.core import SemanticCacheQA
+
+@asynccontextmanager
+async def lifespan(app):
+    # Load the model and connect to Pinecone before accepting traffic, off the event loop
+    qa_system = await asyncio.to_thread(SemanticCacheQA)
+    await asyncio.to_thread(qa_system.warm_up)
+
+    # One pooled HTTP/2 client, so concurrent Pinecone calls share connections
+    async with httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=32),
+        timeout=30
+    ) as http:
+        qa_system.http = http
+        app.state.qa = qa_system
+        yield
+        await qa_system.close()
+
+app = FastAPI(lifespan=lifespan)
+
+# CORS configuration
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+class QuestionRequest(BaseModel):
+    question: str
+    namespace: str = "default"
+
+class FeedbackRequest(BaseModel):
+    question: str
+    helpful: bool
+    namespace: str = "default"
+
+@app.post("/ask")
+async def ask_question(request: QuestionRequest):
+    events = app.state.qa.stream_answer(request.question, request.namespace)
+    try:
+        # Embedding and lookup errors still surface as a 500 before streaming starts
+        first = await anext(events)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def body():
+        yield orjson.dumps(first) + b"\n"
+        async for event in events:
+            yield orjson.dumps(event) + b"\n"
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+@app.post("/feedback")
+async def feedback(request: FeedbackRequest):
+    # Thumbs-up/down on a cached answer nudges that namespace's similarity threshold
+    threshold = app.state.qa.record_feedback(request.helpful, request.question, request.namespace)
+    return {"threshold": threshold}
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,63 @@
+import threading
+
+class AdaptiveThreshold:
+    """Similarity threshold that drifts toward a target cache hit rate"""
+
+    def __init__(self, initial=0.85, min_threshold=0.70, max_threshold=0.98,
+                 target_hit_rate=0.8, step=0.01, adjust_every=50, alpha=0.05):
+        self.value = initial
+        self.min_threshold = min_threshold
+        self.max_threshold = max_threshold
+        self.target_hit_rate = target_hit_rate
+        self.step = step
+        self.adjust_every = adjust_every
+        self.alpha = alpha
+        self.lock = threading.Lock()
+
+        # Start the EWMA at the target so the first window doesn't cause a jump
+        self.hit_rate = target_hit_rate
+        self.hit_count = 0
+        self.miss_count = 0
+        self.thumbs_up = 0
+        self.thumbs_down = 0
+
+        # Counters since the last adjustment
+        self._requests = 0
+        self._window_up = 0
+        self._window_down = 0
+
+    def record(self, hit):
+        """Record whether a semantic lookup was served from the cache"""
+        with self.lock:
+            if hit:
+                self.hit_count += 1
+            else:
+                self.miss_count += 1
+            self.hit_rate += self.alpha * (float(hit) - self.hit_rate)
+            self._requests += 1
+            if self._requests >= self.adjust_every:
+                self._adjust()
+
+    def record_feedback(self, helpful):
+        """Record a thumbs-up/down on an answer served from the cache"""
+        with self.lock:
+            if helpful:
+                self.thumbs_up += 1
+                self._window_up += 1
+            else:
+                self.thumbs_down += 1
+                self._window_down += 1
+
+    def _adjust(self):
+        if self._window_down > self._window_up:
+            # Wrong cached answers cost more than extra LLM calls: tighten first
+            self.value += self.step
+        elif self.hit_rate < self.target_hit_rate:
+            self.value -= self.step
+        elif self.hit_rate > self.target_hit_rate:
+            self.value += self.step
+        self.value = round(min(self.max_threshold, max(self.min_threshold, self.value)), 4)
+
+        self._requests = 0
+        self._window_up = 0
+        self._window_down = 0